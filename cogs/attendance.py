@@ -1647,6 +1647,9 @@ class Attendance(commands.Cog):
             with sqlite3.connect('db/attendance.sqlite') as attendance_db:
                 cursor = attendance_db.cursor()
                 
+                # WAL is stored in the database file, so every connection opened later uses it too
+                cursor.execute("PRAGMA journal_mode=WAL")
+                
                 # Create unified attendance records table
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS attendance_records (
@@ -2068,6 +2071,10 @@ class Attendance(commands.Cog):
                 # Create new session
                 session_id = str(uuid.uuid4())
 
+            # All rows written by this call share one timestamp
+            marked_at = datetime.utcnow().isoformat()
+            event_date_str = event_date.isoformat() if event_date else marked_at
+
             # Save attendance records
             with sqlite3.connect('db/attendance.sqlite') as db:
                 cursor = db.cursor()
@@ -2086,65 +2093,43 @@ class Attendance(commands.Cog):
                         all_members = users_cursor.fetchall()
                     
                     # Insert all members as not_recorded initially
-                    for member in all_members:
-                        member_fid, member_nickname, member_furnace_lv = member
-                        cursor.execute("""
-                            INSERT INTO attendance_records 
-                            (player_id, player_name, session_id, session_name, alliance_id, alliance_name,
-                             status, points, event_type, event_date, 
-                             marked_at, marked_by, marked_by_username)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """, (
-                            str(member_fid), member_nickname, session_id, session_name, 
-                            str(alliance_id), alliance_name,
-                            'not_recorded', 0, 
-                            event_type, 
-                            event_date.isoformat() if event_date else datetime.utcnow().isoformat(),
-                            datetime.utcnow().isoformat(), 
-                            str(interaction.user.id), interaction.user.name
-                        ))
+                    cursor.executemany("""
+                        INSERT INTO attendance_records 
+                        (player_id, player_name, session_id, session_name, alliance_id, alliance_name,
+                         status, points, event_type, event_date, 
+                         marked_at, marked_by, marked_by_username)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, [(
+                        str(member_fid), member_nickname, session_id, session_name, 
+                        str(alliance_id), alliance_name,
+                        'not_recorded', 0, 
+                        event_type, 
+                        event_date_str,
+                        marked_at, 
+                        str(interaction.user.id), interaction.user.name
+                    ) for member_fid, member_nickname, member_furnace_lv in all_members])
                 
-                # Now update with actual attendance data
-                for fid, player_data in selected_players.items():
-                    if player_data['attendance_type'] != 'not_recorded':
-                        # First check if the player exists in attendance_records
-                        cursor.execute("""
-                            SELECT COUNT(*) FROM attendance_records
-                            WHERE player_id = ? AND session_id = ?
-                        """, (str(fid), session_id))
-                        
-                        exists = cursor.fetchone()[0] > 0
-                        
-                        if exists:
-                            # Update the record with actual attendance
-                            cursor.execute("""
-                                UPDATE attendance_records 
-                                SET status = ?, points = ?, marked_at = ?
-                                WHERE player_id = ? AND session_id = ?
-                            """, (
-                                player_data['attendance_type'], 
-                                player_data['points'],
-                                datetime.utcnow().isoformat(),
-                                str(fid), 
-                                session_id
-                            ))
-                        else:
-                            # Player doesn't exist (newly added to alliance), insert them
-                            cursor.execute("""
-                                INSERT INTO attendance_records 
-                                (player_id, player_name, session_id, session_name, alliance_id, alliance_name,
-                                 status, points, event_type, event_date, 
-                                 marked_at, marked_by, marked_by_username)
-                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                            """, (
-                                str(fid), player_data['nickname'], session_id, session_name, 
-                                str(alliance_id), alliance_name,
-                                player_data['attendance_type'], player_data['points'], 
-                                event_type, 
-                                event_date.isoformat() if event_date else datetime.utcnow().isoformat(),
-                                datetime.utcnow().isoformat(), 
-                                str(interaction.user.id), interaction.user.name
-                            ))
+                # Now update with actual attendance data. UNIQUE(session_id, player_id) lets a single upsert
+                # update existing players and insert players newly added to the alliance
+                cursor.executemany("""
+                    INSERT INTO attendance_records 
+                    (player_id, player_name, session_id, session_name, alliance_id, alliance_name,
+                     status, points, event_type, event_date, 
+                     marked_at, marked_by, marked_by_username)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(session_id, player_id) DO UPDATE SET
+                        status = excluded.status,
+                        points = excluded.points,
+                        marked_at = excluded.marked_at
+                """, [(
+                    str(fid), player_data['nickname'], session_id, session_name, 
+                    str(alliance_id), alliance_name,
+                    player_data['attendance_type'], player_data['points'], 
+                    event_type, 
+                    event_date_str,
+                    marked_at, 
+                    str(interaction.user.id), interaction.user.name
+                ) for fid, player_data in selected_players.items() if player_data['attendance_type'] != 'not_recorded'])
                 
                 db.commit()
             
@@ -53,6 +53,8 @@ EVENT_TYPE_ICONS = {
     "Other": "📋"
 }
 
+ARABIC_TEXT_PATTERN = re.compile(r'[\u0600-\u06FF]')
+
 class ExportFormatSelectView(discord.ui.View):
     def __init__(self, cog, records, session_info):
         super().__init__(timeout=300)
@@ -501,17 +503,18 @@ class AttendanceReport(commands.Cog):
                         if result:
                             session_id = result[0]
                     
-                    # Convert to expected format and get event info
+                    # Get event info from the first record that carries it
+                    event_type = next((record[4] for record in db_records if record[4]), None)
+                    event_date = next((record[5] for record in db_records if record[5]), None)
+
+                    # Fetch last event attendance for all players in one query
+                    last_event_attendances = await self.fetch_last_event_attendance(
+                        [record[0] for record in db_records], event_type, event_date, session_id
+                    ) if db_records and event_type and event_date and session_id else {}
+
+                    # Convert to expected format
                     for record in db_records:
-                        if event_type is None:
-                            event_type = record[4]
-                        if event_date is None:
-                            event_date = record[5]
-                        
-                        # Fetch last event attendance for this player
-                        last_event_attendance = await self.fetch_last_event_attendance(
-                            record[0], event_type, event_date, session_id
-                        ) if event_type and event_date and session_id else "N/A"
+                        last_event_attendance = last_event_attendances.get(record[0], "N/A")
                         
                         # Format: (fid, nickname, status, points, last_event_attendance, marked_date, marked_by)
                         records.append((
@@ -548,7 +551,7 @@ class AttendanceReport(commands.Cog):
             table_data = []
             
             def fix_arabic(text):
-                if text and re.search(r'[\u0600-\u06FF]', text):
+                if text and ARABIC_TEXT_PATTERN.search(text):
                     try:
                         reshaped = arabic_reshaper.reshape(text)
                         return get_display(reshaped)
@@ -731,37 +734,40 @@ class AttendanceReport(commands.Cog):
             # Fallback to text report
             await self.show_text_report(interaction, alliance_id, session_name, is_preview, selected_players, session_id, marking_view)
 
-    async def fetch_last_event_attendance(self, player_id: str, event_type: str, event_date: str, session_id: str):
-        """Fetch the last attendance for a player of the same event type before the current event date"""
+    async def fetch_last_event_attendance(self, player_ids, event_type: str, event_date: str, session_id: str):
+        """Fetch the last attendance of the same event type before the current event date for each player"""
         try:
             with sqlite3.connect('db/attendance.sqlite') as db:
                 cursor = db.cursor()
-                # Get the last attendance of the same event type before the current event date
-                cursor.execute("""
-                    SELECT status, event_date 
-                    FROM attendance_records 
-                    WHERE player_id = ? 
-                    AND event_type = ? 
-                    AND event_date < ?
-                    AND session_id != ?
-                    ORDER BY event_date DESC 
-                    LIMIT 1
-                """, (player_id, event_type, event_date, session_id))
-                
-                result = cursor.fetchone()
-                if result:
-                    status, last_date = result
+                # Get the last attendance of the same event type before the current event date, one row per player
+                placeholders = ",".join("?" * len(player_ids))
+                cursor.execute(f"""
+                    SELECT player_id, status, event_date FROM (
+                        SELECT player_id, status, event_date,
+                               ROW_NUMBER() OVER (PARTITION BY player_id ORDER BY event_date DESC) AS rn
+                        FROM attendance_records
+                        WHERE player_id IN ({placeholders})
+                        AND event_type = ?
+                        AND event_date < ?
+                        AND session_id != ?
+                    )
+                    WHERE rn = 1
+                """, (*player_ids, event_type, event_date, session_id))
+
+                last_attendance = {}
+                for player_id, status, last_date in cursor.fetchall():
                     # Format the date
                     try:
                         last_date_obj = datetime.fromisoformat(last_date.replace('Z', '+00:00'))
                         date_str = last_date_obj.strftime("%m/%d")
                     except:
                         date_str = last_date.split('T')[0] if 'T' in last_date else last_date
-                    
+
                     status_display = status.replace('_', ' ').title()
-                    return f"{status_display} ({date_str})"
-                else:
-                    # No record found - check if there are ANY previous events of this type
+                    last_attendance[player_id] = f"{status_display} ({date_str})"
+
+                if len(last_attendance) < len(set(player_ids)):
+                    # No record found for some players - check if there are ANY previous events of this type
                     cursor.execute("""
                         SELECT COUNT(DISTINCT session_id) 
                         FROM attendance_records 
@@ -769,17 +775,18 @@ class AttendanceReport(commands.Cog):
                         AND event_date < ?
                         AND session_id != ?
                     """, (event_type, event_date, session_id))
-                    
+
                     event_count = cursor.fetchone()
-                    if event_count and event_count[0] > 0:
-                        # There were previous events of this type, but player wasn't in them
-                        return "New Player"
-                    else:
-                        # This is the first event of this type
-                        return "First Event"
+                    # There were previous events of this type but the player wasn't in them,
+                    # otherwise this is the first event of this type
+                    missing = "New Player" if event_count and event_count[0] > 0 else "First Event"
+                    for player_id in player_ids:
+                        last_attendance.setdefault(player_id, missing)
+
+                return last_attendance
         except Exception as e:
             print(f"Error fetching last attendance: {e}")
-            return "N/A"
+            return {}
 
     async def show_text_report(self, interaction: discord.Interaction, alliance_id: int, session_name: str,
                              is_preview=False, selected_players=None, session_id=None, marking_view=None):
@@ -856,17 +863,18 @@ class AttendanceReport(commands.Cog):
                         if result:
                             session_id = result[0]
                     
-                    # Convert to expected format and get event info
+                    # Get event info from the first record that carries it
+                    event_type = next((record[4] for record in db_records if record[4]), None)
+                    event_date = next((record[5] for record in db_records if record[5]), None)
+
+                    # Fetch last event attendance for all players in one query
+                    last_event_attendances = await self.fetch_last_event_attendance(
+                        [record[0] for record in db_records], event_type, event_date, session_id
+                    ) if db_records and event_type and event_date and session_id else {}
+
+                    # Convert to expected format
                     for record in db_records:
-                        if event_type is None:
-                            event_type = record[4]
-                        if event_date is None:
-                            event_date = record[5]
-                        
-                        # Fetch last event attendance for this player
-                        last_event_attendance = await self.fetch_last_event_attendance(
-                            record[0], event_type, event_date, session_id
-                        ) if event_type and event_date and session_id else "N/A"
+                        last_event_attendance = last_event_attendances.get(record[0], "N/A")
 
                         records.append((
                             record[0],  # player_id
@@ -53,6 +53,43 @@ class BackupOperations(commands.Cog):
             print(f"Error getting disk space: {e}")
             return None
 
+    def snapshot_databases(self, snapshot_dir):
+        """Copy every database into snapshot_dir using SQLite's online backup API.
+        Unlike copying the files directly, this gives a consistent copy even while the bot
+        is writing, including changes still in the WAL journal.
+        A database that can't be snapshotted falls back to its checkpointed live file, so none is
+        left out. If that fails too, the error is raised and the backup fails."""
+        snapshots = []
+        for file in os.listdir("db"):
+            if file.endswith(".sqlite"):
+                db_path = os.path.join("db", file)
+                snapshot_path = os.path.join(snapshot_dir, file)
+                try:
+                    src = sqlite3.connect(db_path)
+                    try:
+                        dst = sqlite3.connect(snapshot_path)
+                        try:
+                            src.backup(dst)
+                        finally:
+                            dst.close()
+                    finally:
+                        src.close()
+                    snapshots.append((snapshot_path, file))
+                except sqlite3.Error as e:
+                    print(f"Error snapshotting {file}, backing up the live file instead: {e}")
+                    
+                    # The live file only holds all committed data once the WAL journal is merged into it
+                    conn = sqlite3.connect(db_path)
+                    try:
+                        busy, _, _ = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+                    finally:
+                        conn.close()
+                    if busy:
+                        raise sqlite3.OperationalError(f"Could not checkpoint {file}, it is in use")
+                    
+                    snapshots.append((db_path, file))
+        return snapshots
+
     def estimate_backup_size(self):
         """Estimate the size of a backup in MB"""
         try:
@@ -203,6 +240,7 @@ class BackupOperations(commands.Cog):
         return sorted(backup_files, key=os.path.getmtime, reverse=True)
 
     async def create_backup(self, user_id: str, backup_type: str = "Manual", save_locally: bool = True):
+        snapshot_dir = tempfile.TemporaryDirectory()
         try:
             # Get password
             conn = sqlite3.connect(self.db_path)
@@ -212,6 +250,7 @@ class BackupOperations(commands.Cog):
             conn.close()
 
             backup_password = password_result[0] if password_result else None
+            snapshots = self.snapshot_databases(snapshot_dir.name)
 
             timestamp = datetime.datetime.now()
             backup_name = f"{backup_type.lower()}_{timestamp.strftime('%Y%m%d_%H%M%S')}"
@@ -225,10 +264,8 @@ class BackupOperations(commands.Cog):
                     with pyzipper.AESZipFile(filepath, 'w', compression=pyzipper.ZIP_LZMA, encryption=pyzipper.WZ_AES) as zf:
                         zf.setpassword(backup_password.encode())
                         
-                        for file in os.listdir("db"):
-                            if file.endswith(".sqlite"):
-                                file_path = os.path.join("db", file)
-                                zf.write(file_path, file)
+                        for snapshot_path, file in snapshots:
+                            zf.write(snapshot_path, file)
                         
                         readme_content = f"""Encrypted Local Backup
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -241,8 +278,9 @@ Encryption: AES (Password Protected)
 
 To restore:
 1. Extract this ZIP file using your backup password
-2. Replace your db/ folder contents with these files
-3. Restart the bot
+2. Stop the bot and delete any .sqlite-wal and .sqlite-shm files in your db/ folder
+3. Replace your db/ folder contents with these files
+4. Restart the bot
 
 🤖 WOS Discord Bot Backup System
 """
@@ -252,10 +290,8 @@ To restore:
                     filepath = os.path.join(self.backup_dir, filename)
                     
                     with zipfile.ZipFile(filepath, 'w', zipfile.ZIP_DEFLATED) as zf:
-                        for file in os.listdir("db"):
-                            if file.endswith(".sqlite"):
-                                file_path = os.path.join("db", file)
-                                zf.write(file_path, file)
+                        for snapshot_path, file in snapshots:
+                            zf.write(snapshot_path, file)
                         
                         readme_content = f"""Local Backup
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -267,8 +303,9 @@ Contains: All SQLite database files
 
 To restore:
 1. Extract this ZIP file
-2. Replace your db/ folder contents with these files
-3. Restart the bot
+2. Stop the bot and delete any .sqlite-wal and .sqlite-shm files in your db/ folder
+3. Replace your db/ folder contents with these files
+4. Restart the bot
 
 🤖 WOS Discord Bot Backup System
 """
@@ -286,10 +323,8 @@ To restore:
                         with pyzipper.AESZipFile(temp_filepath, 'w', compression=pyzipper.ZIP_LZMA, encryption=pyzipper.WZ_AES) as zf:
                             zf.setpassword(backup_password.encode())
                             
-                            for file in os.listdir("db"):
-                                if file.endswith(".sqlite"):
-                                    file_path = os.path.join("db", file)
-                                    zf.write(file_path, file)
+                            for snapshot_path, file in snapshots:
+                                zf.write(snapshot_path, file)
                             
                             readme_content = f"""Discord Backup
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -302,8 +337,9 @@ Encryption: AES (Password Protected)
 
 To restore:
 1. Extract this ZIP file using your backup password
-2. Replace your db/ folder contents with these files
-3. Restart the bot
+2. Stop the bot and delete any .sqlite-wal and .sqlite-shm files in your db/ folder
+3. Replace your db/ folder contents with these files
+4. Restart the bot
 
 ⚠️ This backup expires in 30 days from Discord
 
@@ -315,10 +351,8 @@ To restore:
                         temp_filepath = os.path.join(temp_dir, filename)
                         
                         with zipfile.ZipFile(temp_filepath, 'w', zipfile.ZIP_DEFLATED) as zf:
-                            for file in os.listdir("db"):
-                                if file.endswith(".sqlite"):
-                                    file_path = os.path.join("db", file)
-                                    zf.write(file_path, file)
+                            for snapshot_path, file in snapshots:
+                                zf.write(snapshot_path, file)
                             
                             readme_content = f"""Discord Backup
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -330,8 +364,9 @@ Contains: All SQLite database files
 
 To restore:
 1. Extract this ZIP file
-2. Replace your db/ folder contents with these files
-3. Restart the bot
+2. Stop the bot and delete any .sqlite-wal and .sqlite-shm files in your db/ folder
+3. Replace your db/ folder contents with these files
+4. Restart the bot
 
 ⚠️ This backup expires in 30 days from Discord
 
@@ -380,6 +415,8 @@ To restore:
             print(f"Backup creation error: {e}")
             traceback.print_exc()
             return None
+        finally:
+            snapshot_dir.cleanup()
 
     async def cleanup_old_backups(self, backup_type: str, keep: int = 2):
         """Clean up old local backups, keeping only the most recent ones"""
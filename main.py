@@ -6,7 +6,33 @@ import os
 import subprocess
 import stat
 import shutil
+import functools
 import hashlib
+import importlib.util
+import logging
+import mmap
+import re
+
+try: # Optional and not in requirements.txt, calculate_file_hash falls back to hashlib's SHA256 without it
+    from blake3 import blake3
+except ImportError:
+    blake3 = None
+
+HASH_CHUNK_SIZE = 1 << 20  # 1 MiB reads keep syscall count low and let update() drop the GIL
+MMAP_THRESHOLD = 10 * 1024 * 1024  # Files this large are hashed straight from the page cache
+REQUIREMENTS_HASH_FILE = ".requirements.hash" # requirements.txt hash and interpreter of the last completed install
+
+REQUIREMENT_NAME_END = re.compile(r"[<>=!~;\[\s]") # First character after the package name in a requirement line
+
+# Requirements whose import name differs from the pip package name (keys are lowercase)
+IMPORT_NAMES = {
+    "discord.py": "discord",
+    "aiohttp-socks": "aiohttp_socks",
+    "python-dotenv": "dotenv",
+    "python-bidi": "bidi",
+    "arabic-reshaper": "arabic_reshaper",
+    "pillow": "PIL",
+}
 
 def is_container() -> bool:
     return os.path.exists("/.dockerenv") or os.path.exists("/var/run/secrets/kubernetes.io")
@@ -36,11 +62,16 @@ def safe_remove(path, is_dir=None):
     Returns:
         bool: True if successfully removed, False otherwise
     """
-    if not os.path.exists(path):
+    try: # A single lstat answers both "does it exist" and "is it a directory"
+        path_stat = os.lstat(path)
+    except FileNotFoundError:
         return True  # Already gone, consider it success
+    except OSError as e:
+        print(f"Warning: Could not access '{path}': {e}")
+        return False
     
     if is_dir is None: # Auto-detect type if not specified
-        is_dir = os.path.isdir(path)
+        is_dir = stat.S_ISDIR(path_stat.st_mode)
     
     try:
         if is_dir:
@@ -67,20 +98,113 @@ def safe_remove(path, is_dir=None):
     
     return False
 
+def fast_copy(src, dst):
+    """
+    Copy a file with its metadata, like shutil.copy2.
+    Uses copy_file_range where available so the kernel does the copy, which is an
+    instant extent clone on copy-on-write filesystems (btrfs, XFS).
+    
+    Args:
+        src: Path of the file to copy
+        dst: Destination file path
+        
+    Returns:
+        str: The destination path, so it can be used as a copytree copy_function
+    """
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            shutil.copystat(src, dst)
+            return dst
+        except OSError:
+            pass # Unsupported by the filesystem or kernel, use the regular copy
+    
+    return shutil.copy2(src, dst)
+
 def calculate_file_hash(filepath):
-    """Calculate SHA256 hash of a file."""
+    """Calculate the hash of a file. Uses BLAKE3 when installed, SHA256 otherwise."""
     if not os.path.exists(filepath):
         return None
     
-    sha256_hash = hashlib.sha256()
     try:
         with open(filepath, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
-        return sha256_hash.hexdigest()
+            file_size = os.fstat(f.fileno()).st_size
+            
+            # Digests are not checked against published SHA256 sums, so the faster BLAKE3 is fine
+            if blake3 is not None:
+                file_hash = blake3()
+            else:
+                file_hash = hashlib.sha256()
+            
+            if file_size >= MMAP_THRESHOLD:
+                try:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        file_hash.update(mm)
+                        return file_hash.hexdigest()
+                except (OSError, ValueError):
+                    pass # mmap can fail on some platforms, fall back to buffered reads
+            
+            if blake3 is None and sys.version_info >= (3, 11):
+                return hashlib.file_digest(f, "sha256").hexdigest()
+
+            # Reuse one buffer instead of allocating a new bytes object per chunk
+            buffer = bytearray(HASH_CHUNK_SIZE)
+            view = memoryview(buffer)
+            while (bytes_read := f.readinto(buffer)):
+                file_hash.update(view[:bytes_read])
+            return file_hash.hexdigest()
     except Exception:
         return None
 
+def run_pip(args):
+    """
+    Run a pip command, in-process when pip is importable so no new interpreter has to start.
+    pip._internal is not a supported API and the in-process run has no timeout, so this is
+    only used for the one-by-one retry, where an interpreter start per package adds up.
+    
+    Args:
+        args: pip arguments, e.g. ["install", "requests"]
+        
+    Returns:
+        bool: True if pip succeeded, False otherwise
+    """
+    args = [*args, "--disable-pip-version-check", "--quiet"]
+    
+    try:
+        from pip._internal.cli.main import main as pip_main
+    except ImportError:
+        pip_main = None
+    
+    if pip_main is None:
+        try:
+            subprocess.check_call([sys.executable, "-m", "pip", *args], timeout=1200, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            return True
+        except Exception:
+            return False
+    
+    # pip configures the root logger for its own output, restore it so the bot's logging is unaffected
+    root_logger = logging.getLogger()
+    saved_handlers, saved_level = root_logger.handlers[:], root_logger.level
+    
+    try:
+        status = pip_main(args)
+    except SystemExit as e:
+        status = e.code
+    except Exception:
+        status = 1
+    finally:
+        root_logger.handlers[:] = saved_handlers
+        root_logger.setLevel(saved_level)
+    
+    importlib.invalidate_caches() # Let later imports see the newly installed packages
+    return not status
+
 def check_and_install_requirements():
     """Check requirements and install missing ones from requirements.txt"""
     if not os.path.exists("requirements.txt"):
@@ -97,43 +221,68 @@ def check_and_install_requirements():
     
     # Test each requirement
     for requirement in requirements:
-        package_name = requirement.split("==")[0].split(">=")[0].split("<=")[0].split("~=")[0].split("!=")[0]
+        package_name = REQUIREMENT_NAME_END.split(requirement, 1)[0]
         
-        try:
-            if package_name == "discord.py":
-                import discord
-            elif package_name == "aiohttp-socks":
-                import aiohttp_socks
-            elif package_name == "python-dotenv":
-                import dotenv
-            elif package_name == "python-bidi":
-                import bidi
-            elif package_name == "arabic-reshaper":
-                import arabic_reshaper
-            elif package_name.lower() == "pillow":
-                import PIL
-            elif package_name.lower() == "numpy":
-                import numpy
-            else:
-                __import__(package_name)
-                        
-        except ImportError:
+        import_name = IMPORT_NAMES.get(package_name.lower(), package_name)
+        
+        try: # Only locate the module, importing heavy packages here would slow down startup
+            is_installed = importlib.util.find_spec(import_name) is not None
+        except (ImportError, ValueError):
+            is_installed = False
+        
+        if not is_installed:
             print(f"✗ {package_name} - MISSING")
             missing_packages.append(requirement)
     
-    if missing_packages: # Install missing packages
-        print(f"Installing {len(missing_packages)} missing packages...")
+    # Probing is cheap, so it always runs. A full install also runs when requirements.txt
+    # changed since the last completed install for this interpreter, to pick up new version pins
+    requirements_stamp = f"{calculate_file_hash('requirements.txt')} {sys.executable}"
+    try:
+        with open(REQUIREMENTS_HASH_FILE, "r") as f:
+            requirements_changed = f.read().strip() != requirements_stamp
+    except OSError:
+        requirements_changed = True
+    
+    if missing_packages or requirements_changed:
+        if missing_packages: # Install missing packages
+            print(f"Installing {len(missing_packages)} missing packages...")
+        else:
+            print("requirements.txt changed, updating installed packages...")
         
-        for package in missing_packages:
-            try:
-                cmd = [sys.executable, "-m", "pip", "install", package, "--no-cache-dir"]
-                
-                subprocess.check_call(cmd, timeout=1200, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try: # One run resolves and downloads everything together, already installed packages are skipped
+            uv_path = shutil.which("uv")
+            if uv_path:
+                cmd = [uv_path, "pip", "install", "--python", sys.executable, "-r", "requirements.txt"]
+            else:
+                cmd = [sys.executable, "-m", "pip", "install", "-r", "requirements.txt", "--no-cache-dir", "--disable-pip-version-check", "--quiet"]
+            
+            subprocess.check_call(cmd, timeout=1200, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            for package in missing_packages:
                 print(f"✓ {package} installed successfully")
                 
-            except Exception as e:
-                print(f"✗ Failed to install {package}: {e}")
+        except Exception as e:
+            if not missing_packages: # Everything needed is importable, keep going with the installed versions
+                print(f"Warning: Could not update packages from requirements.txt: {e}")
+            
+            # Retry one by one so a single bad package doesn't block the rest
+            failed_packages = []
+            
+            for package in missing_packages:
+                if run_pip(["install", package, "--no-cache-dir"]):
+                    print(f"✓ {package} installed successfully")
+                else:
+                    print(f"✗ Failed to install {package}")
+                    failed_packages.append(package)
+            
+            if failed_packages:
                 return False
+        
+        # Stamped once everything is importable, so a failing install isn't rerun on every boot
+        try:
+            with open(REQUIREMENTS_HASH_FILE, "w") as f:
+                f.write(requirements_stamp)
+        except OSError as e:
+            print(f"Warning: Could not save requirements hash: {e}")
     
     print("✓ All requirements satisfied")
     return True
@@ -143,6 +292,7 @@ try:
     import ssl
     import certifi
 
+    @functools.lru_cache(maxsize=1) # Build once, loading the CA bundle per connection is expensive
     def _create_ssl_context_with_certifi():
         return ssl.create_default_context(cafile=certifi.where())
     
@@ -204,6 +354,10 @@ if __name__ == "__main__":
         
         print(Fore.GREEN + f"Migration completed. Now using GitHub release system (current version: {current_version})." + Style.RESET_ALL)
 
+    # Shared by the update check and download so they reuse one pooled TLS connection
+    update_session = requests.Session()
+    update_session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=4))
+
     # Configuration for update sources
     UPDATE_SOURCES = [
         {
@@ -224,7 +378,7 @@ if __name__ == "__main__":
                         # Get latest commit from main branch
                         repo_name = source['api_url'].split('/repos/')[1].split('/releases')[0]
                         branch_url = f"https://api.github.com/repos/{repo_name}/branches/main"
-                        response = requests.get(branch_url, timeout=30)
+                        response = update_session.get(branch_url, timeout=30)
                         if response.status_code == 200:
                             data = response.json()
                             commit_sha = data['commit']['sha'][:7]  # Short SHA
@@ -235,7 +389,7 @@ if __name__ == "__main__":
                                 "source": f"{source['name']} (Beta)"
                             }
                     else:
-                        response = requests.get(source['api_url'], timeout=30)
+                        response = update_session.get(source['api_url'], timeout=30)
                         if response.status_code == 200:
                             data = response.json()
                             # Using GitHub's automatic source archive
@@ -275,20 +429,9 @@ if __name__ == "__main__":
             args = [python] + sys.argv
         os.execl(python, *args)
 
-    def setup_version_table():
-        try:
-            with sqlite3.connect('db/settings.sqlite') as conn:
-                cursor = conn.cursor()
-                cursor.execute('''CREATE TABLE IF NOT EXISTS versions (
-                    file_name TEXT PRIMARY KEY,
-                    version TEXT,
-                    is_main INTEGER DEFAULT 0
-                )''')
-                conn.commit()
-                print(F.GREEN + "Version table created successfully." + R)
-        except Exception as e:
-            print(F.RED + f"Error creating version table: {e}" + R)
-
+    # Stored in each core database's PRAGMA user_version once its tables exist.
+    # Bump it whenever the tables in create_tables change.
+    SCHEMA_VERSION = 1
 
     async def check_and_update_files():
         """Update system using GitHub releases with beta support"""
@@ -346,7 +489,7 @@ if __name__ == "__main__":
                                     print(F.YELLOW + f"WARNING: Couldn't remove db.bak folder. Making backup with timestamp instead." + R)
 
                             try:
-                                shutil.copytree("db", db_bak_path)
+                                shutil.copytree("db", db_bak_path, copy_function=fast_copy)
                                 print(F.GREEN + f"Backup completed: db → {db_bak_path}" + R)
                             except Exception as e:
                                 print(F.RED + f"WARNING: Failed to create database backup: {e}" + R)
@@ -354,11 +497,13 @@ if __name__ == "__main__":
                         download_url = release_info["download_url"]
                         print(F.YELLOW + f"Downloading update from {source_name}..." + R)
                         safe_remove("package.zip", is_dir=False)
-                        download_resp = requests.get(download_url, timeout=600)
+                        download_resp = update_session.get(download_url, timeout=600, stream=True)
                         
                         if download_resp.status_code == 200:
-                            with open("package.zip", "wb") as f:
-                                f.write(download_resp.content)
+                            # Stream to disk so the whole archive is never held in memory
+                            with download_resp, open("package.zip", "wb") as f:
+                                for chunk in download_resp.iter_content(chunk_size=1 << 20):
+                                    f.write(chunk)
                             
                             if os.path.exists("update") and os.path.isdir("update"):
                                 if not safe_remove("update"):
@@ -403,45 +548,49 @@ if __name__ == "__main__":
                                     return
                             
                             # Copy other files
-                            for root, _, files in os.walk(update_dir):
-                                for file in files:
-                                    if file == "main.py":
-                                        continue
-                                        
-                                    src_path = os.path.join(root, file)
-                                    rel_path = os.path.relpath(src_path, update_dir)
-                                    dst_path = os.path.join(".", rel_path)
-                                    
-                                    # Skip certain files that shouldn't be overwritten
-                                    if file in ["bot_token.txt", "version", "autoupdateinfo.txt"] or dst_path.startswith("db/") or dst_path.startswith("db\\"):
-                                        continue
-                                    
-                                    os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+                            protected_files = frozenset(["main.py", "bot_token.txt", "version", "autoupdateinfo.txt"])
+                            no_backup_files = frozenset(["README.md", "requirements.txt"])
+
+                            def ignore_protected(_, names):
+                                """Skip files that shouldn't be overwritten"""
+                                return protected_files.intersection(names)
+
+                            def install_file(src_path, dst_path):
+                                """Copy a single update file into place, backing up important files first"""
+                                file = os.path.basename(dst_path)
+                                
+                                # Only backup important files, skip backing up standard project files
+                                should_backup = (file.endswith(".py") or os.path.normpath(dst_path).startswith("cogs" + os.sep)) and file not in no_backup_files
+                                
+                                if should_backup:
+                                    try:
+                                        os.replace(dst_path, f"{dst_path}.bak") # Overwrites any previous backup
+                                    except FileNotFoundError:
+                                        pass # New file, nothing to back up
+                                    except Exception as e:
+                                        print(F.YELLOW + f"Could not create backup of {dst_path}: {e}" + R)
+                                else: # For standard files, just overwrite without backup
+                                    safe_remove(dst_path, is_dir=False)
+                                
+                                return shutil.copy2(src_path, dst_path)
 
-                                    # Only backup important files
-                                    should_backup = any([
-                                        dst_path.startswith("cogs/"),
-                                        file.endswith(".py")
-                                    ])
+                            with os.scandir(update_dir) as entries:
+                                for entry in entries:
+                                    if entry.name == "db" or entry.name in protected_files:
+                                        continue
                                     
-                                    # Skip backing up standard project files
-                                    if file in ["README.md", "requirements.txt"]:
-                                        should_backup = False
+                                    dst_path = os.path.join(".", entry.name)
                                     
-                                    if os.path.exists(dst_path) and should_backup:
-                                        backup_path = f"{dst_path}.bak"
-                                        safe_remove(backup_path)
-                                        try:
-                                            os.rename(dst_path, backup_path)
-                                        except Exception as e:
-                                            print(F.YELLOW + f"Could not create backup of {dst_path}: {e}" + R)
-                                    elif os.path.exists(dst_path): # For standard files, just overwrite without backup
-                                        safe_remove(dst_path, is_dir=False)
-                                            
                                     try:
-                                        shutil.copy2(src_path, dst_path)
+                                        if entry.is_dir():
+                                            shutil.copytree(entry.path, dst_path, ignore=ignore_protected, copy_function=install_file, dirs_exist_ok=True)
+                                        else:
+                                            install_file(entry.path, dst_path)
+                                    except shutil.Error as e: # copytree keeps going and reports every failed file at the end
+                                        for failed_src, failed_dst, error in e.args[0]:
+                                            print(F.RED + f"Failed to copy {failed_src} to {failed_dst}: {error}" + R)
                                     except Exception as e:
-                                        print(F.RED + f"Failed to copy {file} to {dst_path}: {e}" + R)
+                                        print(F.RED + f"Failed to copy {entry.name} to {dst_path}: {e}" + R)
                             
                             if not safe_remove("update"):
                                 print(F.RED + "WARNING: update folder could not be removed. You may want to remove it manually." + R)
@@ -453,6 +602,7 @@ if __name__ == "__main__":
                             print(F.GREEN + f"Update completed successfully from {source_name}." + R)
                             restart_bot(for_update=True)
                         else:
+                            download_resp.close()
                             print(F.RED + f"Failed to download the update from {source_name}. HTTP status: {download_resp.status_code}" + R)
                             return  
                 else:
@@ -471,8 +621,6 @@ if __name__ == "__main__":
         os.makedirs("db")
         print(F.GREEN + "db folder created" + R)
 
-    setup_version_table()
-    
     # Create version file if it doesn't exist
     if not os.path.exists("version"):
         with open("version", "w") as f:
@@ -537,74 +685,88 @@ if __name__ == "__main__":
         "conn_settings": "db/settings.sqlite",
     }
 
-    connections = {name: sqlite3.connect(path) for name, path in databases.items()}
+    def connect_database(path):
+        """Open a database and switch it to WAL mode, which is stored in the file and applies to the cogs' connections too"""
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    connections = {name: connect_database(path) for name, path in databases.items()}
     print(F.GREEN + "Database connections have been successfully established." + R)
 
     def create_tables():
-        with connections["conn_changes"] as conn_changes:
-            conn_changes.execute("""CREATE TABLE IF NOT EXISTS nickname_changes (
+        schemas = {
+            "conn_changes": """
+            CREATE TABLE IF NOT EXISTS nickname_changes (
                 id INTEGER PRIMARY KEY AUTOINCREMENT, 
                 fid INTEGER, 
                 old_nickname TEXT, 
                 new_nickname TEXT, 
                 change_date TEXT
-            )""")
-            
-            conn_changes.execute("""CREATE TABLE IF NOT EXISTS furnace_changes (
+            );
+            CREATE TABLE IF NOT EXISTS furnace_changes (
                 id INTEGER PRIMARY KEY AUTOINCREMENT, 
                 fid INTEGER, 
                 old_furnace_lv INTEGER, 
                 new_furnace_lv INTEGER, 
                 change_date TEXT
-            )""")
-
-        with connections["conn_settings"] as conn_settings:
-            conn_settings.execute("""CREATE TABLE IF NOT EXISTS botsettings (
+            );""",
+            "conn_settings": """
+            CREATE TABLE IF NOT EXISTS botsettings (
                 id INTEGER PRIMARY KEY, 
                 channelid INTEGER, 
                 giftcodestatus TEXT 
-            )""")
-            
-            conn_settings.execute("""CREATE TABLE IF NOT EXISTS admin (
+            );
+            CREATE TABLE IF NOT EXISTS admin (
                 id INTEGER PRIMARY KEY, 
                 is_initial INTEGER
-            )""")
-
-        with connections["conn_users"] as conn_users:
-            conn_users.execute("""CREATE TABLE IF NOT EXISTS users (
+            );
+            CREATE TABLE IF NOT EXISTS versions (
+                file_name TEXT PRIMARY KEY,
+                version TEXT,
+                is_main INTEGER DEFAULT 0
+            );""",
+            "conn_users": """
+            CREATE TABLE IF NOT EXISTS users (
                 fid INTEGER PRIMARY KEY, 
                 nickname TEXT, 
                 furnace_lv INTEGER DEFAULT 0, 
                 kid INTEGER, 
                 stove_lv_content TEXT, 
                 alliance TEXT
-            )""")
-
-        with connections["conn_giftcode"] as conn_giftcode:
-            conn_giftcode.execute("""CREATE TABLE IF NOT EXISTS gift_codes (
+            );""",
+            "conn_giftcode": """
+            CREATE TABLE IF NOT EXISTS gift_codes (
                 giftcode TEXT PRIMARY KEY, 
                 date TEXT
-            )""")
-            
-            conn_giftcode.execute("""CREATE TABLE IF NOT EXISTS user_giftcodes (
+            );
+            CREATE TABLE IF NOT EXISTS user_giftcodes (
                 fid INTEGER, 
                 giftcode TEXT, 
                 status TEXT, 
                 PRIMARY KEY (fid, giftcode),
                 FOREIGN KEY (giftcode) REFERENCES gift_codes (giftcode)
-            )""")
-
-        with connections["conn_alliance"] as conn_alliance:
-            conn_alliance.execute("""CREATE TABLE IF NOT EXISTS alliancesettings (
+            );""",
+            "conn_alliance": """
+            CREATE TABLE IF NOT EXISTS alliancesettings (
                 alliance_id INTEGER PRIMARY KEY, 
                 channel_id INTEGER, 
                 interval INTEGER
-            )""")
-            
-            conn_alliance.execute("""CREATE TABLE IF NOT EXISTS alliance_list (
+            );
+            CREATE TABLE IF NOT EXISTS alliance_list (
                 alliance_id INTEGER PRIMARY KEY, 
                 name TEXT
-            )""")
+            );""",
+        }
+        
+        for name, schema in schemas.items():
+            conn = connections[name]
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+                continue # Tables already exist, skip parsing the DDL again
+            
+            # One script per database, so its tables and version stamp are committed together
+            with conn:
+                conn.executescript(f"BEGIN;{schema}\n            PRAGMA user_version = {SCHEMA_VERSION};\n            COMMIT;")
 
         print(F.GREEN + "All tables checked." + R)
 
@@ -615,11 +777,12 @@ if __name__ == "__main__":
         
         failed_cogs = []
         
-        for cog in cogs:
-            try:
-                await bot.load_extension(f"cogs.{cog}")
-            except Exception as e:
-                print(f"✗ Failed to load cog {cog}: {e}")
+        # Cogs don't depend on each other during setup, so load them concurrently
+        results = await asyncio.gather(*(bot.load_extension(f"cogs.{cog}") for cog in cogs), return_exceptions=True)
+        
+        for cog, result in zip(cogs, results):
+            if isinstance(result, Exception):
+                print(f"✗ Failed to load cog {cog}: {result}")
                 failed_cogs.append(cog)
         
         if failed_cogs: